@@ -1,36 +1,104 @@
 
 from __future__ import annotations
 import os
+import asyncio
+import tempfile
 import threading
 import time
 import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, Iterable
+from typing import Optional, Iterable, Tuple
 
+import anyio.from_thread
 from fastapi import FastAPI, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from sqlalchemy import text, select, update
+from sqlalchemy import text, select, update, tuple_
 from sqlalchemy.orm import Session
 
-from db import Base, engine, SessionLocal
+from db import Base, engine, SessionLocal, WriterSessionLocal
 from models import Job, Email
-from services.extraction import iter_files, scan_file, looks_like_text
-from services.canonicalize import canon_email
+from services.extraction import (
+    iter_files, scan_file_collect,
+    manifest_path, write_manifest, read_manifest,
+    scan_tree_argv, parse_tree_output, rg_path, RG_READ_HINT,
+)
+
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:  # optional; an exact set is used without it
+    ScalableBloomFilter = None
 
 # ----------------------------------------------------------------------------
 # FastAPI app
 # ----------------------------------------------------------------------------
 
-app = FastAPI(title="Email Intel")
+SCHEMA_VERSION = 1  # PRAGMA user_version once email timestamps are integers
+
+def init_db():
+    """Create or upgrade the schema.
+
+    Called from the lifespan hook rather than at import: spawn-based scan
+    processes re-run this module's top level and must not touch the DB.
+    """
+    # Ensure tables exist (and indexes added to existing tables since)
+    Base.metadata.create_all(bind=engine)
+    for idx in Email.__table__.indexes:
+        idx.create(bind=engine, checkfirst=True)
+
+    # Email timestamps moved from DateTime text to integer UNIX seconds. Convert
+    # rows an older version wrote once, tracked by PRAGMA user_version, so later
+    # startups skip the full-table scans.
+    with engine.begin() as conn:
+        if (conn.exec_driver_sql("PRAGMA user_version").scalar() or 0) < 1:
+            for col in ("first_seen_ts", "last_seen_ts"):
+                conn.exec_driver_sql(
+                    f"UPDATE emails SET {col}=CAST(strftime('%s', {col}) AS INTEGER) WHERE typeof({col})='text'"
+                )
+            conn.exec_driver_sql(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    # FTS5 trigram index over emails for substring search; external-content table
+    # kept in sync by triggers. Flush upserts never touch the email column, so they
+    # skip the index.
+    with engine.begin() as conn:
+        has_fts = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='emails_fts'"
+        ).first()
+        if not has_fts:
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE emails_fts USING fts5("
+                "email, content='emails', content_rowid='id', tokenize='trigram')"
+            )
+            conn.exec_driver_sql("""
+                CREATE TRIGGER IF NOT EXISTS emails_fts_ai AFTER INSERT ON emails BEGIN
+                    INSERT INTO emails_fts(rowid, email) VALUES (new.id, new.email);
+                END""")
+            conn.exec_driver_sql("""
+                CREATE TRIGGER IF NOT EXISTS emails_fts_ad AFTER DELETE ON emails BEGIN
+                    INSERT INTO emails_fts(emails_fts, rowid, email) VALUES ('delete', old.id, old.email);
+                END""")
+            conn.exec_driver_sql("""
+                CREATE TRIGGER IF NOT EXISTS emails_fts_au AFTER UPDATE OF email ON emails BEGIN
+                    INSERT INTO emails_fts(emails_fts, rowid, email) VALUES ('delete', old.id, old.email);
+                    INSERT INTO emails_fts(rowid, email) VALUES (new.id, new.email);
+                END""")
+            conn.exec_driver_sql("INSERT INTO emails_fts(emails_fts) VALUES ('rebuild')")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    init_db()
+    yield
+
+app = FastAPI(title="Email Intel", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
-
 # ----------------------------------------------------------------------------
 # Dependency
 # ----------------------------------------------------------------------------
@@ -64,6 +132,17 @@ def page_jobs(request: Request, db: Session = Depends(get_db)):
 def page_emails(request: Request):
     return templates.TemplateResponse("emails.html", {"request": request})
 
+# ----------------------------------------------------------------------------
+# In-process job controls
+# ----------------------------------------------------------------------------
+
+# job_id -> {"paused": Event, "cancelled": Event}. The API handlers flip these
+# (and still persist the flags to the DB); workers read them without a query.
+JOB_CONTROLS: dict[int, dict[str, threading.Event]] = {}
+
+def job_controls(job_id: int) -> dict[str, threading.Event]:
+    return JOB_CONTROLS.setdefault(job_id, {"paused": threading.Event(), "cancelled": threading.Event()})
+
 # ----------------------------------------------------------------------------
 # Jobs API
 # ----------------------------------------------------------------------------
@@ -73,29 +152,17 @@ def list_jobs(db: Session = Depends(get_db)):
     jobs = db.query(Job).order_by(Job.created_ts.desc()).limit(200).all()
     return [j.as_dict() for j in jobs]
 
+JOB_ROWS_TMPL = templates.get_template("job_rows_partial.html")
+
 def job_rows(db: Session) -> str:
-    rows = []
-    for j in db.query(Job).order_by(Job.created_ts.desc()).limit(200).all():
-        progress = f"{(j.processed_bytes / j.total_bytes * 100.0):.1f}%" if j.total_bytes else "0.0%"
-        eta = f"{int(j.eta_seconds)}s" if j.eta_seconds is not None else "0s"
-        mbps = f"{j.mbps:.2f}"
-        rows.append(f"""
-        <tr>
-            <td>{j.name}</td>
-            <td>{j.status}</td>
-            <td>{progress}</td>
-            <td>{mbps}</td>
-            <td>{eta}</td>
-            <td>{j.emails_found}</td>
-            <td>
-                <button class="btn btn-yellow" hx-post="/api/jobs/{j.id}/pause" hx-swap="none">Pause</button>
-                <button class="btn btn-green" hx-post="/api/jobs/{j.id}/resume" hx-swap="none">Resume</button>
-                <button class="btn btn-red"   hx-post="/api/jobs/{j.id}/cancel" hx-swap="none">Cancel</button>
-                <button class="btn btn-red"   hx-post="/api/jobs/{j.id}/delete" hx-swap="none">Delete</button>
-            </td>
-        </tr>
-        """.strip())
-    return "\n".join(rows)
+    # Polled every second by the dashboard: fetch only the rendered columns as
+    # plain rows rather than full ORM objects
+    rows = db.execute(
+        select(Job.id, Job.name, Job.status, Job.processed_bytes, Job.total_bytes,
+               Job.mbps, Job.eta_seconds, Job.emails_found)
+        .order_by(Job.created_ts.desc()).limit(200)
+    ).all()
+    return JOB_ROWS_TMPL.render(jobs=rows)
 
 @app.get("/api/jobs/table", response_class=HTMLResponse)
 def jobs_table(db: Session = Depends(get_db)):
@@ -120,12 +187,24 @@ def create_job(
     if not os.path.exists(server_path):
         raise HTTPException(status_code=400, detail="Path not found")
 
-    # Gather files
-    files = list(iter_files(server_path))
-    if not files:
+    # Gather files once. Directories scanned by a single rg run never read a
+    # manifest, so only total the sizes; otherwise write the manifest the
+    # worker streams from instead of walking the tree a second time.
+    tmp_manifest = None
+    if os.path.isdir(server_path) and rg_path():
+        n_files = total_bytes = 0
+        for _, sz in iter_files(server_path):
+            n_files += 1
+            total_bytes += sz
+    else:
+        fd, tmp_manifest = tempfile.mkstemp(prefix="emailintel_", suffix=".files")
+        os.close(fd)
+        n_files, total_bytes = write_manifest(iter_files(server_path), tmp_manifest)
+    if not n_files:
+        if tmp_manifest:
+            os.remove(tmp_manifest)
         raise HTTPException(status_code=400, detail="No readable files found")
 
-    total_bytes = sum(sz for _, sz in files)
     j = Job(
         name=name.strip() or "scan",
         status="queued",
@@ -143,10 +222,13 @@ def create_job(
     db.add(j)
     db.commit()
     db.refresh(j)
+    if tmp_manifest:
+        os.replace(tmp_manifest, manifest_path(j.id))
 
-    # Start worker thread
-    th = threading.Thread(target=worker_run, args=(j.id, server_path), daemon=True)
-    th.start()
+    # Start the worker as a task on the app's event loop (this sync handler
+    # runs in a threadpool thread, so hop over to the loop to schedule it)
+    job_controls(j.id)
+    anyio.from_thread.run_sync(_spawn_worker, j.id, server_path)
 
     return {"id": j.id, "name": j.name, "status": j.status, "total_bytes": j.total_bytes}
 
@@ -154,24 +236,32 @@ def create_job(
 def pause_job(job_id: int, db: Session = Depends(get_db)):
     db.execute(update(Job).where(Job.id == job_id).values(paused=True))
     db.commit()
+    if job_id in JOB_CONTROLS:
+        JOB_CONTROLS[job_id]["paused"].set()
     return {"ok": True}
 
 @app.post("/api/jobs/{job_id}/resume")
 def resume_job(job_id: int, db: Session = Depends(get_db)):
     db.execute(update(Job).where(Job.id == job_id).values(paused=False, status="running"))
     db.commit()
+    if job_id in JOB_CONTROLS:
+        JOB_CONTROLS[job_id]["paused"].clear()
     return {"ok": True}
 
 @app.post("/api/jobs/{job_id}/cancel")
 def cancel_job(job_id: int, db: Session = Depends(get_db)):
     db.execute(update(Job).where(Job.id == job_id).values(cancelled=True, status="cancelled"))
     db.commit()
+    if job_id in JOB_CONTROLS:
+        JOB_CONTROLS[job_id]["cancelled"].set()
     return {"ok": True}
 
 @app.post("/api/jobs/{job_id}/delete")
 def delete_job(job_id: int, db: Session = Depends(get_db)):
     db.query(Job).filter(Job.id == job_id).delete()
     db.commit()
+    if job_id in JOB_CONTROLS:
+        JOB_CONTROLS[job_id]["cancelled"].set()
     return {"ok": True}
 
 # ----------------------------------------------------------------------------
@@ -179,98 +269,302 @@ def delete_job(job_id: int, db: Session = Depends(get_db)):
 # ----------------------------------------------------------------------------
 
 @app.get("/api/emails")
-def list_emails(q: Optional[str] = None, limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    stmt = select(Email).order_by(Email.last_seen_ts.desc()).limit(limit).offset(offset)
-    if q:
-        stmt = select(Email).where(Email.email.ilike(f"%{q.lower()}%")).order_by(Email.last_seen_ts.desc()).limit(limit).offset(offset)
+def list_emails(
+    q: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    after_ts: Optional[int] = None,
+    after_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    # Keyset pagination: pass back next_cursor as after_ts/after_id to get the
+    # next page without OFFSET scanning past earlier rows. Offset is kept for
+    # the first page only.
+    if (after_ts is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_ts and after_id must be given together")
+    keyset_page = after_ts is not None
+    if keyset_page:
+        offset = 0
+    q = (q or "").strip().lower()
+    if len(q) >= 3:
+        # The trigram index serves LIKE '%q%' directly (needs 3+ characters),
+        # so this is the same substring match as ilike without the table scan.
+        keyset = "AND (e.last_seen_ts, e.id) < (:after_ts, :after_id)" if keyset_page else ""
+        sql = text(f"""
+            SELECT e.* FROM emails_fts f JOIN emails e ON e.id = f.rowid
+            WHERE f.email LIKE :like {keyset}
+            ORDER BY e.last_seen_ts DESC, e.id DESC LIMIT :limit OFFSET :offset
+        """).bindparams(like=f"%{q}%", limit=limit, offset=offset)
+        if keyset_page:
+            sql = sql.bindparams(after_ts=after_ts, after_id=after_id)
+        stmt = select(Email).from_statement(sql)
+    else:
+        stmt = select(Email)
+        if q:
+            stmt = stmt.where(Email.email.ilike(f"%{q}%"))
+        if keyset_page:
+            stmt = stmt.where(tuple_(Email.last_seen_ts, Email.id) < (after_ts, after_id))
+        stmt = stmt.order_by(Email.last_seen_ts.desc(), Email.id.desc()).limit(limit).offset(offset)
     rows = db.execute(stmt).scalars().all()
-    return [{"email": r.email, "first_seen_ts": r.first_seen_ts.isoformat(), "last_seen_ts": r.last_seen_ts.isoformat(), "seen_count": r.seen_count} for r in rows]
+    items = [{"email": r.email, "first_seen_ts": datetime.utcfromtimestamp(r.first_seen_ts).isoformat(), "last_seen_ts": datetime.utcfromtimestamp(r.last_seen_ts).isoformat(), "seen_count": r.seen_count} for r in rows]
+    next_cursor = {"ts": rows[-1].last_seen_ts, "id": rows[-1].id} if rows and len(rows) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
 
 # ----------------------------------------------------------------------------
 # Worker
 # ----------------------------------------------------------------------------
 
-def worker_run(job_id: int, server_path: str):
-    """Background job that scans files and writes unique emails to the DB."""
-    db = SessionLocal()
+# Strong refs to running worker tasks (the loop only keeps weak ones)
+WORKER_TASKS: set[asyncio.Task] = set()
+
+def _spawn_worker(job_id: int, server_path: str):
+    """Schedule worker_run on the running event loop (call from the loop thread)."""
+    task = asyncio.get_running_loop().create_task(worker_run(job_id, server_path))
+    WORKER_TASKS.add(task)
+    task.add_done_callback(WORKER_TASKS.discard)
+
+async def worker_run(job_id: int, server_path: str):
+    """Background job that scans files and writes unique emails to the DB.
+
+    Runs as a task on the app's event loop: file scans go to a process pool and
+    the blocking SQLite session work is pushed to a thread via asyncio.to_thread.
+    """
+    db = WriterSessionLocal()
+    ctl = job_controls(job_id)
+    paused, cancelled = ctl["paused"], ctl["cancelled"]
     try:
-        job = db.get(Job, job_id)
+        job = await asyncio.to_thread(_start_job, db, job_id)
         if not job:
             return
-        job.status = "running"
-        job.processed_bytes = 0
-        job.started_ts = datetime.utcnow()
-        db.commit()
+        if job.paused:
+            paused.set()
+        if job.cancelled:
+            cancelled.set()
+        workers = max(1, job.workers or 1)
+        total_bytes = job.total_bytes or 0
 
         t0 = time.time()
+        last_metrics_ts = 0.0
         processed_bytes = 0
         emails_batch = set()
-        batch_size = 2000
-
-        for path, fsize in iter_files(server_path):
-            # Responsive controls
-            job = db.get(Job, job_id)
-            if not job or job.cancelled:
-                break
-            while job.paused:
-                time.sleep(0.5)
-                job = db.get(Job, job_id)
-                if job.cancelled:
-                    break
-            if not job or job.cancelled:
-                break
-
-            # Skip non-text quickly
-            if not looks_like_text(path):
-                processed_bytes += fsize
-                _update_metrics(db, job, processed_bytes, t0)
-                continue
-
-            # Scan one file
-            for email in scan_file(path):
-                emails_batch.add(canon_email(email))
-                if len(emails_batch) >= batch_size:
-                    _flush_emails(db, job, emails_batch)
-                    emails_batch.clear()
-
-            processed_bytes += fsize
-            _update_metrics(db, job, processed_bytes, t0)
+        seen = _seen_filter()  # emails already sent to the DB by this job
+        counts: Counter[str] = Counter()  # repeat sightings, folded into seen_count
+        batch_size = 50000  # ~5 MB of emails; one commit per flush
+
+        async def absorb(groups: Iterable[Iterable[str]]):
+            # Per-email filter tests are pure Python (a Bloom filter especially)
+            # and can run long for a big file, so keep them off the event loop
+            await asyncio.to_thread(_absorb, db, job, groups, seen, counts, emails_batch, batch_size)
+
+        async def tick():
+            # Throttle progress writes to about once a second
+            nonlocal last_metrics_ts
+            if time.time() - last_metrics_ts > 1.0:
+                await asyncio.to_thread(_update_metrics, db, job, processed_bytes, t0)
+                last_metrics_ts = time.time()
+
+        tree_argv = scan_tree_argv(server_path, workers) if os.path.isdir(server_path) else None
+        if tree_argv:
+            # One ripgrep over the whole directory: no per-file process spawn,
+            # and rg walks the tree with its own thread pool. Pausing just stops
+            # reading; the pipe fills and rg blocks until resumed.
+            proc = await asyncio.create_subprocess_exec(
+                *tree_argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+            last: dict = {}  # most recent rg path and the emails counted for it
+            tail = b""
+            try:
+                while True:
+                    while paused.is_set() and not cancelled.is_set():
+                        await asyncio.sleep(0.5)
+                    if cancelled.is_set():
+                        break
+                    data = await proc.stdout.read(RG_READ_HINT)
+                    if not data:
+                        break
+                    groups, new_bytes, tail = await asyncio.to_thread(_read_tree_chunk, tail + data, last)
+                    processed_bytes += new_bytes
+                    await absorb(groups)
+                    await tick()
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
+            if not cancelled.is_set():
+                # Files without matches never show up in rg's output
+                processed_bytes = total_bytes
+        else:
+            # Fan files out to a process pool; keep a bounded number in flight
+            # so a huge tree doesn't queue every path (and its results) at once.
+            loop = asyncio.get_running_loop()
+            manifest = manifest_path(job_id)
+            files = iter(read_manifest(manifest) if os.path.exists(manifest) else iter_files(server_path))
+            pending: dict[asyncio.Future, int] = {}
+            max_inflight = workers * 2
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+            try:
+                while True:
+                    # Responsive controls (in-process events, no DB round-trip)
+                    while paused.is_set() and not cancelled.is_set():
+                        await asyncio.sleep(0.5)
+                    if cancelled.is_set():
+                        break
+
+                    while len(pending) < max_inflight:
+                        nxt = next(files, None)
+                        if nxt is None:
+                            break
+                        path, fsize = nxt
+                        # scan_file_collect skips non-text itself, so the sniff's
+                        # file read happens in the pool rather than on the loop
+                        pending[loop.run_in_executor(pool, scan_file_collect, path)] = fsize
+                    if not pending:
+                        break
+
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for fut in done:
+                        processed_bytes += pending.pop(fut)
+                        await absorb([fut.result()])
+                    await tick()
+            finally:
+                # Don't block the loop waiting on in-flight scans
+                pool.shutdown(wait=False, cancel_futures=True)
 
         # Final flush
-        if emails_batch:
-            _flush_emails(db, job, emails_batch)
+        if emails_batch or counts:
+            await asyncio.to_thread(_flush_emails, db, job, emails_batch, counts)
             emails_batch.clear()
+            counts.clear()
 
-        job = db.get(Job, job_id)
-        if job and not job.cancelled:
-            job.status = "done"
-            job.finished_ts = datetime.utcnow()
-            _update_metrics(db, job, processed_bytes, t0)
-            db.commit()
+        await asyncio.to_thread(_finish_job, db, job_id, cancelled.is_set(), processed_bytes, t0)
     except Exception as e:
         # Mark job failed and continue
-        job = db.get(Job, job_id)
-        if job:
-            job.status = "failed"
-            db.commit()
+        await asyncio.to_thread(_fail_job, db, job_id)
         print("Worker error:", repr(e))
     finally:
+        JOB_CONTROLS.pop(job_id, None)
+        try:
+            os.remove(manifest_path(job_id))
+        except OSError:
+            pass
         db.close()
 
-def _flush_emails(db: Session, job: Job, emails: set[str]):
-    if not emails:
+def _absorb(db: Session, job: Job, groups: Iterable[Iterable[str]], seen, counts: Counter,
+            emails_batch: set[str], batch_size: int):
+    """Fold per-file email sets into the pending batch, flushing when it fills.
+
+    First sightings this job go to emails_batch; repeats only bump counts.
+    """
+    for found in groups:
+        for ce in found:
+            if ce in seen:
+                counts[ce] += 1
+            else:
+                seen.add(ce)
+                emails_batch.add(ce)
+        if len(emails_batch) + len(counts) >= batch_size:
+            _flush_emails(db, job, emails_batch, counts)
+            emails_batch.clear()
+            counts.clear()
+
+def _read_tree_chunk(buf: bytes, last: dict) -> Tuple[list[set[str]], int, bytes]:
+    """Parse one read of scan_tree_argv output (run in a thread, off the loop).
+
+    Returns the per-file email sets, the size of files seen for the first time
+    (progress counts a file once its first match shows up) and the unfinished
+    trailing line. rg writes each file's matches contiguously, so only the
+    latest path can continue into the next read; `last` carries that path and
+    the emails already counted for it, so a file split across reads still
+    counts each email once, as the process-pool path does.
+    """
+    by_path, tail = parse_tree_output(buf)
+    groups = []
+    new_bytes = 0
+    for path, found in by_path.items():
+        if path == last.get("path"):
+            found = found - last["emails"]
+            last["emails"] |= found
+        else:
+            try:
+                new_bytes += os.stat(path).st_size
+            except OSError:
+                pass
+            last["path"], last["emails"] = path, set(found)
+        groups.append(found)
+    return groups, new_bytes, tail
+
+def _start_job(db: Session, job_id: int) -> Optional[Job]:
+    job = db.get(Job, job_id)
+    if not job:
+        return None
+    job.status = "running"
+    job.processed_bytes = 0
+    job.started_ts = datetime.utcnow()
+    db.commit()
+    db.refresh(job)
+    return job
+
+def _finish_job(db: Session, job_id: int, cancelled: bool, processed_bytes: int, t0: float):
+    job = db.get(Job, job_id)
+    if job and not job.cancelled and not cancelled:
+        job.status = "done"
+        job.finished_ts = datetime.utcnow()
+        _update_metrics(db, job, processed_bytes, t0)
+        db.commit()
+
+def _fail_job(db: Session, job_id: int):
+    db.rollback()
+    job = db.get(Job, job_id)
+    if job:
+        job.status = "failed"
+        db.commit()
+
+UPSERT_CHUNK = 900  # rows per statement; 3 params each stays well under SQLite's variable limit
+
+def _seen_filter():
+    """Membership filter for emails this job has already written.
+
+    A Bloom filter keeps memory bounded on huge corpora; a false positive only
+    routes a new email through the repeat-count upsert, so nothing is lost.
+    """
+    if ScalableBloomFilter is not None:
+        return ScalableBloomFilter(initial_capacity=1_000_000, error_rate=0.001)
+    return set()
+
+def _flush_emails(db: Session, job: Job, emails: set[str], counts: Optional[Counter] = None):
+    if not emails and not counts:
         return
-    now = datetime.utcnow().isoformat(sep=' ', timespec='seconds')
-    # Raw SQLite UPSERT for speed
-    db.execute(text("""
-        INSERT INTO emails (email, first_seen_ts, last_seen_ts, seen_count)
-        VALUES (:e, :now, :now, 1)
-        ON CONFLICT(email) DO UPDATE SET
-            last_seen_ts=excluded.last_seen_ts,
-            seen_count=emails.seen_count+1
-    """), [{"e": e, "now": now} for e in emails])
-    # Update job count
-    job.emails_found = db.execute(text("SELECT COUNT(*) FROM emails")).scalar() or 0
+    now = int(time.time())  # UNIX seconds; emails timestamps are INTEGER columns
+    # Raw SQLite multi-row UPSERT for speed; RETURNING (SQLite 3.35+) flags fresh
+    # inserts so the job count is a running sum instead of a COUNT(*) over the table.
+    conn = db.connection()
+    batch = list(emails)
+    new_count = 0
+    for i in range(0, len(batch), UPSERT_CHUNK):
+        chunk = batch[i:i + UPSERT_CHUNK]
+        sql = (
+            "INSERT INTO emails (email, first_seen_ts, last_seen_ts, seen_count) VALUES "
+            + ",".join(["(?, ?, ?, 1)"] * len(chunk))
+            + " ON CONFLICT(email) DO UPDATE SET"
+              " last_seen_ts=excluded.last_seen_ts,"
+              " seen_count=emails.seen_count+1"
+              " RETURNING seen_count = 1"
+        )
+        params = tuple(v for e in chunk for v in (e, now, now))
+        new_count += sum(r[0] for r in conn.exec_driver_sql(sql, params))
+    # Repeat sightings: one row per email with its summed count. Still an upsert
+    # so a Bloom false positive (never actually inserted) creates the row.
+    if counts:
+        db.execute(text("""
+            INSERT INTO emails (email, first_seen_ts, last_seen_ts, seen_count)
+            VALUES (:e, :now, :now, :c)
+            ON CONFLICT(email) DO UPDATE SET
+                last_seen_ts=excluded.last_seen_ts,
+                seen_count=emails.seen_count+excluded.seen_count
+        """), [{"e": e, "now": now, "c": c} for e, c in counts.items()])
+    job.emails_found = (job.emails_found or 0) + new_count
     db.commit()
 
 def _update_metrics(db: Session, job: Job, processed_bytes: int, t0: float):
@@ -1,8 +1,48 @@
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
-engine = create_engine("sqlite:///emailintel.db", connect_args={"check_same_thread": False})
+DB_URL = "sqlite:///emailintel.db"
+CONNECT_ARGS = {"check_same_thread": False, "timeout": 30}
+
+# A small connection pool so API reads get their own connection (and, with WAL,
+# their own snapshot) instead of queuing behind the worker's writes. Sized to
+# the handful of concurrent requests this app serves.
+engine = create_engine(DB_URL, connect_args=CONNECT_ARGS, poolclass=QueuePool, pool_size=4, max_overflow=4)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Job workers write through their own engine so only their connections carry
+# the large page cache. SQLite has a single writer anyway, so keep it tiny.
+writer_engine = create_engine(DB_URL, connect_args=CONNECT_ARGS, poolclass=QueuePool, pool_size=1, max_overflow=3)
+WriterSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
+
 Base = declarative_base()
+
+# Per-connection PRAGMAs: these are not persisted in the DB file (except
+# journal_mode), so apply them every time a pool opens a connection.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA wal_autocheckpoint=10000",
+    "PRAGMA mmap_size=268435456",  # read pages via mmap instead of read() calls
+)
+WRITER_PRAGMAS = (
+    "PRAGMA cache_size=-200000",  # 200 MB, per connection
+)
+
+def _run_pragmas(dbapi_conn, pragmas):
+    cur = dbapi_conn.cursor()
+    for pragma in pragmas:
+        cur.execute(pragma)
+    cur.close()
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, _record):
+    _run_pragmas(dbapi_conn, SQLITE_PRAGMAS)
+
+@event.listens_for(writer_engine, "connect")
+def _set_writer_pragmas(dbapi_conn, _record):
+    _run_pragmas(dbapi_conn, SQLITE_PRAGMAS + WRITER_PRAGMAS)
@@ -1,6 +1,7 @@
 
+import time
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, BigInteger, Index
 from sqlalchemy.orm import declarative_base
 from db import Base
 
@@ -40,6 +41,12 @@ class Email(Base):
     __tablename__ = "emails"
     id = Column(Integer, primary_key=True, autoincrement=True)
     email = Column(String, unique=True, index=True, nullable=False)
-    first_seen_ts = Column(DateTime, default=datetime.utcnow, nullable=False)
-    last_seen_ts = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # UNIX seconds: smaller rows and cheaper comparisons than DateTime text
+    first_seen_ts = Column(BigInteger, default=lambda: int(time.time()), nullable=False)
+    last_seen_ts = Column(BigInteger, default=lambda: int(time.time()), nullable=False)
     seen_count = Column(Integer, default=1, nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination in /api/emails walks (last_seen_ts, id) descending
+        Index("idx_emails_lastseen_id", last_seen_ts.desc(), id.desc()),
+    )
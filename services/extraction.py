@@ -1,9 +1,42 @@
 
 from __future__ import annotations
-import os, re, subprocess, sys, shutil, io
+import os, re, subprocess, sys, shutil, io, mmap, tempfile
+from itertools import islice
 from typing import Iterable, Tuple
 
-EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}", re.IGNORECASE)
+from services.canonicalize import canon_batch
+
+try:
+    import hyperscan
+except ImportError:  # optional; the Python fallback uses `re` without it
+    hyperscan = None
+
+# Case is covered by the explicit classes, so no IGNORECASE; re.ASCII keeps the
+# str pattern off the Unicode-aware matching path (emails are ASCII anyway).
+EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}", re.ASCII)
+EMAIL_RE_BYTES = re.compile(EMAIL_RE.pattern.encode())
+
+SCAN_CHUNK = 1024*1024*8
+HS_OVERLAP = 256  # bytes carried across chunk boundaries (longer than any sane email)
+MMAP_MIN_BYTES = 1024*1024  # below this a plain read is cheaper than mapping
+MATCH_BATCH = 10000  # matches per list handed back by scan_file
+RG_READ_HINT = 256*1024  # ~10k ripgrep output lines per readlines() call
+
+def _hs_database():
+    if hyperscan is None:
+        return None
+    try:
+        hs_db = hyperscan.Database()
+        hs_db.compile(
+            expressions=[EMAIL_RE.pattern.encode()],
+            ids=[0],
+            flags=[hyperscan.HS_FLAG_SOM_LEFTMOST],
+        )
+        return hs_db
+    except Exception:
+        return None
+
+HS_DB = _hs_database()
 
 def rg_path() -> str | None:
     exe = shutil.which("rg")
@@ -13,51 +46,232 @@ def iter_files(path: str) -> Iterable[Tuple[str, int]]:
     """Yield (file_path, size) for files under path or a single file."""
     if os.path.isfile(path):
         try:
-            return [(path, os.path.getsize(path))]
+            yield (path, os.path.getsize(path))
+        except OSError:
+            pass
+        return
+    # os.scandir hands back the stat info from the directory read, which saves
+    # a separate getsize() call per file compared to os.walk
+    stack = [path]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
         except OSError:
-            return []
-    out = []
-    for root, _, files in os.walk(path):
-        for name in files:
-            p = os.path.join(root, name)
-            try:
-                out.append((p, os.path.getsize(p)))
-            except OSError:
-                continue
-    return out
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield (entry.path, entry.stat().st_size)
+                except OSError:
+                    continue
+
+def manifest_path(job_id: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"emailintel_job_{job_id}.files")
+
+def write_manifest(files: Iterable[Tuple[str, int]], path: str) -> Tuple[int, int]:
+    """Write (file_path, size) entries to a manifest; return (count, total_bytes).
+
+    Records are `size\\tpath\\0` in raw filesystem bytes: NUL is the one byte
+    a POSIX path can't contain, so newlines in file names are safe.
+    """
+    count = total = 0
+    with open(path, "wb") as f:
+        for p, sz in files:
+            f.write(b"%d\t%s\0" % (sz, os.fsencode(p)))
+            count += 1
+            total += sz
+    return count, total
+
+def read_manifest(path: str) -> Iterable[Tuple[str, int]]:
+    """Stream (file_path, size) entries back from a manifest in constant memory."""
+    with open(path, "rb") as f:
+        tail = b""
+        for chunk in iter(lambda: f.read(1024*1024), b""):
+            records = (tail + chunk).split(b"\0")
+            tail = records.pop()
+            for rec in records:
+                sz, _, p = rec.partition(b"\t")
+                yield (os.fsdecode(p), int(sz))
+
+BIN_EXT_SET = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".ico", ".webp", ".heic", ".psd",
+    ".mp3", ".mp4", ".m4a", ".m4v", ".mov", ".avi", ".mkv", ".webm", ".wav", ".flac", ".ogg",
+    ".pdf", ".zip", ".rar", ".7z", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".tar", ".jar",
+    ".exe", ".dll", ".so", ".dylib", ".o", ".a", ".class", ".pyc", ".bin", ".iso", ".img", ".dmg",
+    ".parquet", ".orc", ".avro", ".feather", ".arrow", ".sqlite", ".db", ".npy", ".npz", ".pkl",
+    ".woff", ".woff2", ".ttf", ".otf",
+})
+SNIFF_BYTES = 512
+# Control bytes other than \t \n \v \f \r; a text file has few of these
+CONTROL_BYTES = bytes(range(9)) + bytes(range(14, 32))
 
 def looks_like_text(path: str) -> bool:
-    # Quick filter for obvious binaries
+    # Quick filter for obvious binaries by extension, then sniff the first bytes
     ext = os.path.splitext(path)[1].lower()
-    if ext in {".png",".jpg",".jpeg",".gif",".bmp",".pdf",".zip",".rar",".7z",".exe",".dll",".so"}:
+    if ext in BIN_EXT_SET:
+        return False
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
         return False
-    return True
+    if b"\x00" in head:
+        return False
+    if not head:
+        return True
+    n_control = len(head) - len(head.translate(None, CONTROL_BYTES))
+    return n_control / len(head) < 0.30
 
 def scan_file(path: str):
-    """Yield raw emails from a file. Use ripgrep if available; fallback to Python."""
+    """Yield lists of raw emails (ASCII bytes) from a file. Use ripgrep if available; fallback to Python.
+
+    Matches come back in batches (one list per buffer / ~MATCH_BATCH matches)
+    so callers can consume them with C-level list/set operations.
+    Directories go through scan_tree_argv instead.
+    """
     rg = rg_path()
     if rg:
         try:
-            # -I ignore binary, -o print matches only, --no-messages suppress errors
-            proc = subprocess.Popen(
-                [rg, "-INo", "--no-messages", "--regexp", EMAIL_RE.pattern, path],
-                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding="utf-8", errors="ignore"
-            )
+            # -I no filename, -N no line numbers, -o print matches only,
+            # -a skip binary detection (callers filter with looks_like_text),
+            # --no-messages suppress errors
+            cmd = [rg, "-INoa", "--no-messages", "--regexp", EMAIL_RE.pattern, "--", path]
+            # Binary stdout: emails are ASCII, so skip the text-mode decode layer
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1024*1024)
             assert proc.stdout is not None
-            for line in proc.stdout:
-                line = line.strip()
-                if line:
-                    yield line
+            for lines in iter(lambda: proc.stdout.readlines(RG_READ_HINT), []):
+                yield [line.rstrip(b"\r\n") for line in lines]
             proc.wait()
             return
         except Exception:
             pass
 
-    # Fallback (stream read)
+    if HS_DB is not None:
+        try:
+            with open(path, "rb") as f:
+                yield from _hs_scan(f)
+            return
+        except Exception:
+            return
+
+    # Fallback: regex straight over the raw bytes (mmap for large files), so
+    # there is no decode pass and no matches are lost at chunk boundaries
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            for chunk in iter(lambda: f.read(1024*1024*8), ""):
-                for m in EMAIL_RE.finditer(chunk):
-                    yield m.group(0)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < MMAP_MIN_BYTES:
+                yield EMAIL_RE_BYTES.findall(f.read())
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                matches = EMAIL_RE_BYTES.finditer(mm)
+                for batch in iter(lambda: [m.group(0) for m in islice(matches, MATCH_BATCH)], []):
+                    yield batch
     except Exception:
         return
+
+def scan_tree_argv(root: str, threads: int = 1) -> list[str] | None:
+    """ripgrep command that scans a whole directory in one process, or None without rg.
+
+    Prints `path\\0match` per match (-H with --null). rg walks the tree with
+    `threads` threads; known binary extensions are excluded up front.
+
+    Note this filters binaries differently from scan_file_collect: rg skips a
+    file once it sees a NUL byte, and never runs looks_like_text. A file with
+    no NUL but mostly control bytes is therefore scanned here, while the
+    single-file / no-rg path skips it after the 512-byte sniff.
+    """
+    rg = rg_path()
+    if not rg:
+        return None
+    cmd = [rg, "-Ho", "--null", "--no-line-number", "--no-messages", "--no-ignore", "--hidden", f"-j{max(1, threads)}"]
+    cmd += [f"--iglob=!*{ext}" for ext in sorted(BIN_EXT_SET)]
+    cmd += ["--regexp", EMAIL_RE.pattern, "--", root]
+    return cmd
+
+def parse_tree_output(buf: bytes) -> Tuple[dict[bytes, set[str]], bytes]:
+    """Group complete `path\\0match` lines into {path: canonical emails}.
+
+    Returns the trailing partial line as well, to prepend to the next read.
+    """
+    lines = buf.split(b"\n")
+    tail = lines.pop()
+    by_path: dict[bytes, list[bytes]] = {}
+    for line in lines:
+        path, _, raw = line.partition(b"\0")
+        by_path.setdefault(path, []).append(raw)
+    out = {}
+    for path, raws in by_path.items():
+        found = set(canon_batch(set(raws)))
+        found.discard(b"")
+        out[path] = {e.decode("ascii", "ignore") for e in found}
+    return out, tail
+
+def scan_file_collect(path: str) -> set[str]:
+    """Scan one file and return its unique canonical emails.
+
+    Top-level so it can be shipped to a spawn-based process pool. Files that
+    don't look like text come back empty without being scanned.
+    """
+    if not looks_like_text(path):
+        return set()
+    found: set[bytes] = set()
+    for batch in scan_file(path):
+        # Real corpora repeat the same addresses heavily; dedupe the raw
+        # matches first so each distinct string is canonicalized once
+        found.update(canon_batch(set(batch)))
+    found.discard(b"")
+    return {e.decode("ascii", "ignore") for e in found}
+
+def _hs_scan(f):
+    """Yield lists of raw email bytes from a binary stream using the Hyperscan database.
+
+    Hyperscan reports every end offset of a match; with SOM_LEFTMOST each end
+    carries its leftmost start, so the longest end per start is the greedy
+    match. The last HS_OVERLAP bytes of each buffer are rescanned with the next
+    chunk so emails straddling a boundary are not lost.
+    """
+    carry = b""
+    skip = 0
+    while True:
+        chunk = f.read(SCAN_CHUNK)
+        eof = not chunk
+        buf = carry + chunk
+        if not buf:
+            return
+        spans: dict[int, int] = {}
+
+        def on_match(_id, start, end, _flags, _ctx):
+            if end > spans.get(start, -1):
+                spans[start] = end
+
+        HS_DB.scan(buf, match_event_handler=on_match)
+        cut = len(buf) if eof else max(0, len(buf) - HS_OVERLAP)
+        emitted_end = skip
+        batch = []
+        for start in sorted(spans):
+            if start >= cut:
+                break
+            end = spans[start]
+            if start < emitted_end:
+                if end <= emitted_end:
+                    continue
+                # Only the leftmost start is reported per end, so a match that
+                # begins inside the previous one (foo@bar.com+baz@qux.com) shows
+                # up with the wrong start; recover it the way `re` would.
+                m = EMAIL_RE_BYTES.search(buf, emitted_end, end)
+                if m is None:
+                    continue
+                m = EMAIL_RE_BYTES.match(buf, m.start())
+                if m.start() >= cut:
+                    break
+                start, end = m.span()
+            emitted_end = end
+            batch.append(buf[start:end])
+        if batch:
+            yield batch
+        if eof:
+            return
+        carry = buf[cut:]
+        skip = max(0, emitted_end - cut)
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+import services.extraction as extraction
+from services.extraction import EMAIL_RE_BYTES
+
+
+class FakeHyperscan:
+    """Stand-in for a compiled HS_FLAG_SOM_LEFTMOST database: one event per
+    end offset, carrying the leftmost start that matches up to that end."""
+
+    def scan(self, buf, match_event_handler):
+        for end in range(1, len(buf) + 1):
+            for start in range(end):
+                if EMAIL_RE_BYTES.fullmatch(buf, start, end):
+                    match_event_handler(0, start, end, 0, None)
+                    break
+
+
+@pytest.fixture
+def fake_hs(monkeypatch):
+    monkeypatch.setattr(extraction, "HS_DB", FakeHyperscan())
+
+
+def hs_scan_all(data: bytes) -> list[bytes]:
+    return [e for batch in extraction._hs_scan(io.BytesIO(data)) for e in batch]
+
+
+@pytest.mark.parametrize("data", [
+    b"mail foo@bar.com and a.b@c.org here",
+    b"foo@bar.com+baz@qux.com",
+    b"a@b.com.x@c.org",
+    b"x foo@bar.co.uk,bar@baz.io;qux@quux.net end",
+])
+def test_hs_scan_matches_re(fake_hs, data):
+    assert hs_scan_all(data) == EMAIL_RE_BYTES.findall(data)
+
+
+def test_hs_scan_across_chunk_boundaries(fake_hs, monkeypatch):
+    monkeypatch.setattr(extraction, "SCAN_CHUNK", 40)
+    monkeypatch.setattr(extraction, "HS_OVERLAP", 32)
+    data = b" ".join(b"user%d@example%d.com" % (i, i) for i in range(8)) + b" foo@bar.com+baz@qux.com"
+    assert hs_scan_all(data) == EMAIL_RE_BYTES.findall(data)